@@ -15,12 +15,39 @@ class Settings(BaseSettings):
     ATLAS_URI: str  # MongoDB connection string
     DB_NAME: str
 
+    FEED_CACHE_PATH: str = "feed_cache.pickle"  # Warm cache snapshot file
+    FEED_CACHE_TTL: int = 600  # Seconds before a cached feed is revalidated
+    FEED_CACHE_SNAPSHOT_INTERVAL: int = 300  # Seconds between snapshots
+
+    FEED_USER_AGENT: str = (
+        "telegram-bot/0.1.0 (+https://github.com/eqsdxr/telegram-bot-example)"
+    )
+    FEED_FETCH_TIMEOUT: float = 10.0
+    FEED_MAX_CONNECTIONS: int = 100
+    FEED_MAX_CONNECTIONS_PER_HOST: int = 6
+    FEED_DNS_CACHE_TTL: int = 300  # Seconds to reuse a resolved address
+    FEED_FETCH_STATS_INTERVAL: int = 300  # Seconds between fetch stats logs
+
+    JOB_LEASE_SECONDS: int = 60  # Unrenewed leases expire and are re-claimed
+    JOB_SYNC_INTERVAL: int = 60  # Seconds between syncing jobs with subscriptions
+    JOB_POLL_INTERVAL: float = 1.0  # Seconds to wait when the queue is empty
+    JOB_RETRY_DELAY: int = 30  # Base delay before retrying a failed refresh
+
+    SEARCH_PAGE_SIZE: int = 10
+    SEARCH_TIMEOUT_MS: int = 2000
+    SEARCH_REMEMBERED_QUERIES: int = 20  # Queries whose page buttons still work
+    SEARCH_RETENTION_DAYS: int = 30  # How long fetched entries stay searchable
+
     START_MESSAGE: str = (
         "Welcome to rss news reader bot"
         "\nChoose an option:"
         "\n/get <number> - scrap <number> news"
         "\n/add <rss_link> - add rss news source"
         "\n/remove - remove feed"
+        "\n/search <query> - search your feeds"
+        "\n/include <feed_number> <keyword> - show only matching news"
+        "\n/exclude <feed_number> <keyword> - hide matching news"
+        "\n/clearfilters <feed_number> - remove all feed filters"
         "\n/status - get status"
         "\n/help - get help"
     )
@@ -29,8 +56,13 @@ class Settings(BaseSettings):
         "\n/get <number> - scrap <number> news"
         "\n/add <rss_link> - add rss news source"
         "\n/remove - remove feed"
+        "\n/search <query> - search your feeds"
+        "\n/include <feed_number> <keyword> - show only matching news"
+        "\n/exclude <feed_number> <keyword> - hide matching news"
+        "\n/clearfilters <feed_number> - remove all feed filters"
         "\n/status - get status"
         "\n/help - get help"
+        "\n\nWrap a filter in slashes to use a regex, e.g. /^breaking/"
     )
 
     UNKNOWN_MESSAGE: str = "Unknown command."
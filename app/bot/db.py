@@ -1,5 +1,8 @@
+from calendar import timegm
+from datetime import datetime, timedelta, timezone
+
 from loguru import logger
-from pymongo import MongoClient
+from pymongo import ASCENDING, TEXT, MongoClient, UpdateOne
 from telegram import User
 
 from app.bot.config import app_settings
@@ -8,6 +11,25 @@ from app.bot.exc import RSSAlreadyExist, UnexpectedDeletionError
 client = MongoClient(app_settings.ATLAS_URI)
 db = client["app"]
 users_collection = db["users"]
+entries_collection = db["entries"]
+feeds_collection = db["feeds"]  # Compact feeds shared by all processes
+jobs_collection = db["jobs"]
+
+
+def ensure_indexes():
+    feeds_collection.create_index("url", unique=True)
+    jobs_collection.create_index([("kind", ASCENDING), ("key", ASCENDING)], unique=True)
+    jobs_collection.create_index([("status", ASCENDING), ("run_at", ASCENDING)])
+    entries_collection.create_index(
+        [("feed_url", ASCENDING), ("link", ASCENDING)], unique=True
+    )
+    entries_collection.create_index([("title", TEXT), ("summary", TEXT)])
+    entries_collection.create_index(  # Drop old entries to keep the index small
+        "stored_at",
+        expireAfterSeconds=int(
+            timedelta(days=app_settings.SEARCH_RETENTION_DAYS).total_seconds()
+        ),
+    )
 
 
 def add_user(user: User):
@@ -57,3 +79,77 @@ def remove_rss(user: User, rss_title: str):
         raise UnexpectedDeletionError(
             f"User {user.id} had multiple matching entries removed."
         )
+
+
+def add_rss_filter(user: User, rss_url: str, kind: str, pattern: str):
+    # kind is either "include" or "exclude"
+    result = users_collection.update_one(
+        {"user_id": user.id, "rss_list.url": rss_url},
+        {"$addToSet": {f"rss_list.$.{kind}": pattern}},
+    )
+    if result.matched_count == 0:
+        raise ValueError("Subscription not found")
+
+
+def clear_rss_filters(user: User, rss_url: str):
+    result = users_collection.update_one(
+        {"user_id": user.id, "rss_list.url": rss_url},
+        {"$set": {"rss_list.$.include": [], "rss_list.$.exclude": []}},
+    )
+    if result.matched_count == 0:
+        raise ValueError("Subscription not found")
+
+
+def store_entries(feed_url: str, entries: list):
+    now = datetime.now(timezone.utc)
+    operations = []
+    for entry in entries:
+        if not entry.get("link"):
+            continue
+        published = entry.get("published_parsed")
+        operations.append(
+            UpdateOne(
+                {"feed_url": feed_url, "link": entry["link"]},
+                {
+                    "$set": {
+                        "title": entry.get("title", ""),
+                        "summary": entry.get("summary", ""),
+                        "published": (
+                            datetime.fromtimestamp(timegm(published), timezone.utc)
+                            if published
+                            else now
+                        ),
+                        "stored_at": now,
+                    }
+                },
+                upsert=True,
+            )
+        )
+    if operations:
+        entries_collection.bulk_write(operations, ordered=False)
+
+
+def search_entries(feed_urls: list[str], query: str, skip: int, limit: int):
+    cursor = (
+        entries_collection.find(
+            {"$text": {"$search": query}, "feed_url": {"$in": feed_urls}},
+            {"score": {"$meta": "textScore"}, "title": 1, "link": 1},
+        )
+        .sort([("score", {"$meta": "textScore"}), ("published", -1)])
+        .skip(skip)
+        .limit(limit)
+        .max_time_ms(app_settings.SEARCH_TIMEOUT_MS)  # Fixed latency budget
+    )
+    return list(cursor)
+
+
+def get_subscribed_urls() -> list[str]:
+    return users_collection.distinct("rss_list.url")
+
+
+def load_shared_feed(url: str):
+    return feeds_collection.find_one({"url": url}, {"_id": 0, "url": 0})
+
+
+def save_shared_feed(url: str, cached: dict):
+    feeds_collection.replace_one({"url": url}, {"url": url, **cached}, upsert=True)
@@ -8,3 +8,7 @@ class RSSAlreadyExist(Exception):
 
 class UnexpectedDeletionError(Exception):
     pass
+
+
+class InvalidFilterError(Exception):
+    pass
@@ -1,9 +1,144 @@
-from feedparser import parse
+import os
+import pickle
+from time import time
+from typing import cast
+
+import httpx
+from feedparser import FeedParserDict, parse
+from loguru import logger
+from pymongo.errors import PyMongoError
+
 from app.bot import exc
+from app.bot.config import app_settings
+from app.bot.db import load_shared_feed, save_shared_feed, store_entries
+from app.bot.fetch import fetch
+
+# url -> {"etag", "modified", "fetched_at", "title", "entries": [(title, link)]}
+feed_cache: dict[str, dict] = {}
+
+
+def _compact_feed(feed, response: httpx.Response) -> dict:
+    return {
+        "etag": response.headers.get("etag"),
+        "modified": response.headers.get("last-modified"),
+        "fetched_at": time(),
+        "title": feed.feed.get("title", ""),
+        "entries": [
+            (entry.get("title", ""), entry.get("link", "")) for entry in feed.entries
+        ],
+    }
+
+
+def _expand_feed(cached: dict) -> FeedParserDict:
+    return FeedParserDict(
+        {
+            "bozo": 0,
+            "feed": FeedParserDict({"title": cached["title"]}),
+            "entries": [
+                FeedParserDict({"title": title, "link": link})
+                for title, link in cached["entries"]
+            ],
+        }
+    )
+
+
+def load_snapshot(path: str | None = None):
+    path = path or app_settings.FEED_CACHE_PATH
+    try:
+        with open(path, "rb") as f:
+            feed_cache.update(pickle.load(f))
+    except FileNotFoundError:
+        return
+    except Exception as e:  # A broken snapshot just means a cold start
+        logger.warning(f"Failed to load feed cache snapshot {path}: {e}")
+        return
+    logger.info(f"Loaded {len(feed_cache)} feeds from cache snapshot {path}")
+
+
+def save_snapshot(path: str | None = None):
+    path = path or app_settings.FEED_CACHE_PATH
+    tmp_path = f"{path}.{os.getpid()}.tmp"  # Unique per process
+    try:
+        with open(tmp_path, "wb") as f:
+            pickle.dump(feed_cache, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp_path, path)  # Never leave a half-written snapshot behind
+    except OSError as e:
+        logger.warning(f"Failed to save feed cache snapshot {path}: {e}")
+
+
+def _is_fresh(cached: dict | None) -> bool:
+    if not cached:
+        return False
+    return time() - cached["fetched_at"] < app_settings.FEED_CACHE_TTL
+
+
+def _load_shared(url: str, cached: dict | None) -> dict | None:
+    try:
+        shared = load_shared_feed(url)
+    except PyMongoError as e:
+        logger.warning(f"Failed to load shared feed {url}: {e}")
+        return cached
+    if shared and (not cached or shared["fetched_at"] > cached["fetched_at"]):
+        feed_cache[url] = shared
+        return shared
+    return cached
+
+
+def _save_shared(url: str, cached: dict):
+    try:
+        save_shared_feed(url, cached)
+    except PyMongoError as e:
+        logger.warning(f"Failed to save shared feed {url}: {e}")
+
+
+def _serve_stale(url: str, cached: dict | None):
+    if not cached:
+        raise exc.InvalidRSSURLError()
+    # One flaky feed shouldn't fail the whole /get while a copy is at hand
+    logger.warning(f"Failed to revalidate {url}, serving cached copy")
+    return _expand_feed(cached)
 
 
 def get_rss_data(url: str):
-    feed = parse(url)
+    cached = feed_cache.get(url)
+    if not _is_fresh(cached):
+        # A worker or another replica may have refreshed it already
+        cached = _load_shared(url, cached)
+    if _is_fresh(cached):
+        return _expand_feed(cast(dict, cached))
+
+    headers = {}
+    if cached:
+        # Revalidate stale feed, server answers 304 if nothing changed
+        if cached["etag"]:
+            headers["If-None-Match"] = cached["etag"]
+        if cached["modified"]:
+            headers["If-Modified-Since"] = cached["modified"]
+
+    try:
+        response = fetch(url, headers)
+    except (httpx.HTTPError, httpx.InvalidURL) as e:
+        logger.warning(f"Failed to fetch {url}: {e}")
+        return _serve_stale(url, cached)
+
+    if cached and response.status_code == 304:
+        cached["fetched_at"] = time()
+        _save_shared(url, cached)
+        return _expand_feed(cached)
+    if response.is_error:
+        return _serve_stale(url, cached)
+
+    feed = parse(
+        response.content,
+        # Let feedparser resolve relative links against the final feed url
+        response_headers={**response.headers, "content-location": str(response.url)},
+    )
     if feed.bozo:
-        raise exc.InvalidRSSURLError()
+        return _serve_stale(url, cached)
+    feed_cache[url] = _compact_feed(feed, response)
+    _save_shared(url, feed_cache[url])
+    try:
+        store_entries(url, feed.entries)  # Keep entries searchable by /search
+    except PyMongoError as e:
+        logger.warning(f"Failed to store entries of {url}: {e}")
     return feed
@@ -0,0 +1,157 @@
+import socket
+from collections import defaultdict
+from threading import BoundedSemaphore, Lock
+from time import monotonic
+from urllib.request import getproxies
+
+from loguru import logger
+
+import httpcore
+import httpx
+
+from app.bot.config import app_settings
+
+ACCEPT_ENCODING = "gzip, br"  # Decoded by httpx through its brotli extra
+
+fetch_stats = {
+    "requests": 0,
+    "connections_opened": 0,
+    "bytes_downloaded": 0,  # As received on the wire, before decompression
+    "bytes_decoded": 0,
+}
+_stats_lock = Lock()
+
+# host -> (addresses, expires_at)
+_dns_cache: dict[str, tuple[list[str], float]] = {}
+_dns_lock = Lock()
+
+_host_semaphores: defaultdict[str, BoundedSemaphore] = defaultdict(
+    lambda: BoundedSemaphore(app_settings.FEED_MAX_CONNECTIONS_PER_HOST)
+)
+_host_semaphores_lock = Lock()
+
+
+def _count(key: str, value: int = 1):
+    with _stats_lock:
+        fetch_stats[key] += value
+
+
+def resolve(host: str) -> list[str]:
+    now = monotonic()
+    with _dns_lock:
+        cached = _dns_cache.get(host)
+        if cached and cached[1] > now:
+            return cached[0]
+    addresses = list(  # Deduplicated, in resolver order
+        dict.fromkeys(
+            info[4][0]
+            for info in socket.getaddrinfo(host, None, type=socket.SOCK_STREAM)
+        )
+    )
+    with _dns_lock:
+        _dns_cache[host] = (addresses, now + app_settings.FEED_DNS_CACHE_TTL)
+    return addresses
+
+
+class _CachingDNSBackend(httpcore.SyncBackend):
+    """Resolves through the DNS cache, TLS still verifies the original hostname."""
+
+    def connect_tcp(self, host, port, timeout=None, *args, **kwargs):
+        try:
+            addresses = resolve(host)
+        except OSError as e:
+            raise httpcore.ConnectError(str(e)) from e
+        error = httpcore.ConnectError(f"No addresses for {host}")
+        # Try every address like socket.create_connection, e.g. an AAAA record
+        # may be unreachable on a host without IPv6 routing
+        for address in addresses:
+            try:
+                stream = super().connect_tcp(address, port, timeout, *args, **kwargs)
+            except (httpcore.ConnectError, httpcore.ConnectTimeout) as e:
+                error = e
+                continue
+            _count("connections_opened")
+            return stream
+        raise error
+
+
+def _proxy_mounts() -> dict[str, httpx.BaseTransport | None]:
+    """Passing transport= turns off httpx's HTTP(S)_PROXY/NO_PROXY support,
+    so mount the environment proxies explicitly."""
+    proxies = getproxies()
+    if proxies.get("no", "").strip() == "*":
+        return {}
+    mounts: dict[str, httpx.BaseTransport | None] = {}
+    for scheme in ("http", "https"):
+        proxy = proxies.get(scheme) or proxies.get("all")
+        if proxy:
+            mounts[f"{scheme}://"] = _build_transport(proxy)
+    if mounts:
+        for host in proxies.get("no", "").split(","):
+            host = host.strip().lstrip(".")
+            if host:
+                mounts[f"all://{host}"] = None  # None uses the direct transport
+                mounts[f"all://*.{host}"] = None
+    return mounts
+
+
+def _build_transport(proxy: str | None = None) -> httpx.HTTPTransport:
+    transport = httpx.HTTPTransport(
+        proxy=proxy,
+        http2=True,
+        limits=httpx.Limits(
+            max_connections=app_settings.FEED_MAX_CONNECTIONS,
+            max_keepalive_connections=app_settings.FEED_MAX_CONNECTIONS,
+        ),
+        retries=1,
+    )
+    # httpx doesn't expose the network backend, so swap it on the httpcore pool.
+    # Both packages are pinned to minor versions where this attribute exists.
+    transport._pool._network_backend = _CachingDNSBackend()
+    return transport
+
+
+def _build_client() -> httpx.Client:
+    return httpx.Client(
+        transport=_build_transport(),
+        mounts=_proxy_mounts(),
+        headers={
+            "User-Agent": app_settings.FEED_USER_AGENT,
+            "Accept": "application/rss+xml, application/atom+xml, application/xml",
+            "Accept-Encoding": ACCEPT_ENCODING,
+        },
+        timeout=app_settings.FEED_FETCH_TIMEOUT,
+        follow_redirects=True,
+    )
+
+
+http_client = _build_client()
+
+
+def fetch(url: str, headers: dict[str, str] | None = None) -> httpx.Response:
+    host = httpx.URL(url).host
+    with _host_semaphores_lock:
+        semaphore = _host_semaphores[host]
+    with semaphore:  # Limit concurrent requests to the same host
+        response = http_client.get(url, headers=headers)
+    _count("requests")
+    _count("bytes_downloaded", response.num_bytes_downloaded)
+    _count("bytes_decoded", len(response.content))
+    return response
+
+
+def get_fetch_stats() -> dict:
+    with _stats_lock:
+        stats = dict(fetch_stats)
+    stats["connections_reused"] = max(
+        stats["requests"] - stats["connections_opened"], 0
+    )
+    return stats
+
+
+def log_fetch_stats():
+    logger.info(f"Feed fetch stats: {get_fetch_stats()}")
+
+
+def close_http_client():
+    http_client.close()
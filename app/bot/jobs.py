@@ -0,0 +1,127 @@
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from threading import Event, Thread
+
+from loguru import logger
+from pymongo import ReturnDocument, UpdateOne
+from pymongo.errors import BulkWriteError, PyMongoError
+
+from app.bot.config import app_settings
+from app.bot.db import get_subscribed_urls, jobs_collection
+
+REFRESH_JOB = "refresh"
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def sync_refresh_jobs() -> int:
+    """Make sure every subscribed feed has exactly one refresh job."""
+    urls = get_subscribed_urls()
+    now = _now()
+    operations = [
+        UpdateOne(
+            {"kind": REFRESH_JOB, "key": url},
+            {
+                "$setOnInsert": {
+                    "status": "pending",
+                    "run_at": now,
+                    "lease_owner": None,
+                    "lease_expires_at": None,
+                    "attempts": 0,
+                }
+            },
+            upsert=True,  # Unique (kind, key) index keeps concurrent syncs safe
+        )
+        for url in urls
+    ]
+    if operations:
+        try:
+            jobs_collection.bulk_write(operations, ordered=False)
+        except BulkWriteError as e:
+            # Another worker inserted the same job first, that's fine
+            if any(error["code"] != 11000 for error in e.details["writeErrors"]):
+                raise
+    jobs_collection.delete_many({"kind": REFRESH_JOB, "key": {"$nin": urls}})
+    return len(urls)
+
+
+def claim_job(worker_id: str):
+    now = _now()
+    return jobs_collection.find_one_and_update(
+        {
+            "run_at": {"$lte": now},
+            "$or": [
+                {"status": "pending"},
+                {"status": "leased", "lease_expires_at": {"$lt": now}},  # Abandoned
+            ],
+        },
+        {
+            "$set": {
+                "status": "leased",
+                "lease_owner": worker_id,
+                "lease_expires_at": now
+                + timedelta(seconds=app_settings.JOB_LEASE_SECONDS),
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("run_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def extend_lease(job: dict, worker_id: str) -> bool:
+    result = jobs_collection.update_one(
+        {"_id": job["_id"], "lease_owner": worker_id, "status": "leased"},
+        {
+            "$set": {
+                "lease_expires_at": _now()
+                + timedelta(seconds=app_settings.JOB_LEASE_SECONDS)
+            }
+        },
+    )
+    return result.matched_count == 1
+
+
+def release_job(job: dict, worker_id: str, delay: float, failed: bool = False) -> bool:
+    """Give the job back to the queue to run again after delay seconds."""
+    update = {
+        "status": "pending",
+        "run_at": _now() + timedelta(seconds=delay),
+        "lease_owner": None,
+        "lease_expires_at": None,
+    }
+    if not failed:
+        update["attempts"] = 0
+    result = jobs_collection.update_one(
+        {"_id": job["_id"], "lease_owner": worker_id, "status": "leased"},
+        {"$set": update},
+    )
+    if result.matched_count == 0:
+        logger.warning(f"Worker {worker_id} lost the lease on job {job['_id']}")
+        return False
+    return True
+
+
+@contextmanager
+def heartbeat(job: dict, worker_id: str):
+    stop = Event()
+
+    def beat():
+        interval = app_settings.JOB_LEASE_SECONDS / 3
+        while not stop.wait(interval):
+            try:
+                if not extend_lease(job, worker_id):
+                    logger.warning(f"Worker {worker_id} lost job {job['_id']}")
+                    return
+            except PyMongoError as e:
+                logger.warning(f"Heartbeat for job {job['_id']} failed: {e}")
+
+    thread = Thread(target=beat, daemon=True)
+    thread.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,171 @@
+import re
+from functools import lru_cache
+from typing import Callable
+
+from loguru import logger
+
+from app.bot.exc import InvalidFilterError
+
+# Constructs that break or change meaning once regexes are joined with "|":
+# global inline flags, named groups, backreferences and conditional groups
+_UNSAFE_REGEX = re.compile(r"\(\?[aiLmsux]+\)|\(\?P[<=]|\(\?\(|(?<!\\)(?:\\\\)*\\[1-9]")
+MAX_FILTER_LENGTH = 100
+
+
+def is_regex(pattern: str) -> bool:
+    return len(pattern) > 2 and pattern.startswith("/") and pattern.endswith("/")
+
+
+def _skip_class(regex: str, start: int) -> int:
+    end = start + 1
+    if regex.startswith("^", end):
+        end += 1
+    if regex.startswith("]", end):
+        end += 1  # A leading "]" is a literal
+    while end < len(regex) and regex[end] != "]":
+        end += 2 if regex[end] == "\\" else 1
+    return end + 1
+
+
+def _has_nested_quantifier(regex: str) -> bool:
+    """Find repeated groups that already repeat or alternate, like (a+)+ or
+    (a|aa)*, which backtrack exponentially on titles that almost match."""
+    groups: list[bool] = []  # Whether each open group repeats or alternates
+    closed_risky = False
+    index = 0
+    while index < len(regex):
+        char = regex[index]
+        after_risky_group, closed_risky = closed_risky, False
+        if char == "\\":
+            index += 2
+            continue
+        if char == "[":
+            index = _skip_class(regex, index)
+            continue
+        if char == "(":
+            groups.append(False)
+            if regex.startswith("?", index + 1):
+                index += 1  # (?:, (?=, (?!... aren't quantifiers
+        elif char == ")":
+            closed_risky = groups.pop() if groups else False
+            if closed_risky and groups:
+                groups[-1] = True
+        elif char in "*+{":
+            if after_risky_group:
+                return True
+            if groups:
+                groups[-1] = True
+        elif char in "?|" and groups:
+            groups[-1] = True
+        index += 1
+    return False
+
+
+def _check_filter(pattern: str):
+    if not pattern.strip():
+        raise InvalidFilterError("Empty filter")
+    if len(pattern) > MAX_FILTER_LENGTH:
+        raise InvalidFilterError("Filter is too long")
+    if not is_regex(pattern):
+        return
+    regex = pattern[1:-1]
+    if _UNSAFE_REGEX.search(regex):
+        raise InvalidFilterError(
+            "Inline flags, named groups and backreferences aren't supported"
+        )
+    if _has_nested_quantifier(regex):
+        raise InvalidFilterError("Nested repeats aren't supported")
+    try:
+        re.compile(regex)
+    except re.error as e:
+        raise InvalidFilterError(str(e)) from e
+
+
+def validate_filter(pattern: str, existing: list[str] | None = None):
+    _check_filter(pattern)
+    try:
+        # The filter must also compile together with the ones already stored
+        re.compile(_join((*(existing or []), pattern)), re.IGNORECASE)
+    except (re.error, RecursionError) as e:
+        raise InvalidFilterError(str(e)) from e
+
+
+def _safe_filters(patterns: tuple[str, ...]) -> tuple[str, ...]:
+    safe = []
+    for pattern in patterns:
+        try:
+            _check_filter(pattern)
+        except InvalidFilterError as e:
+            # Stored before validation was this strict, never run it
+            logger.warning(f"Skipping unsafe filter {pattern}: {e}")
+            continue
+        safe.append(pattern)
+    return tuple(safe)
+
+
+def _trie_pattern(words: list[str]) -> str:
+    """Build a regex from a character trie so shared prefixes are matched once."""
+    trie: dict = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[""] = {}  # End of keyword
+    return _node_pattern(trie)
+
+
+def _node_pattern(node: dict) -> str:
+    if "" in node:
+        return ""  # A shorter keyword already matches, no need to go deeper
+    alternatives = [
+        re.escape(char) + _node_pattern(child) for char, child in sorted(node.items())
+    ]
+    if len(alternatives) == 1:
+        return alternatives[0]
+    return "(?:" + "|".join(alternatives) + ")"
+
+
+def _join(patterns: tuple[str, ...]) -> str:
+    keywords = [p.lower() for p in patterns if not is_regex(p)]
+    parts = [f"(?:{p[1:-1]})" for p in patterns if is_regex(p)]
+    if keywords:
+        parts.insert(0, _trie_pattern(keywords))
+    return "|".join(parts)
+
+
+def _combine(patterns: tuple[str, ...]) -> list[re.Pattern]:
+    patterns = _safe_filters(patterns)
+    if not patterns:
+        return []
+    try:
+        return [re.compile(_join(patterns), re.IGNORECASE)]
+    except (re.error, RecursionError) as e:
+        # Filters stored before validation covered the joined pattern, so
+        # compile them one by one and skip the broken ones
+        logger.warning(f"Failed to combine filters, compiling separately: {e}")
+    compiled = []
+    for pattern in patterns:
+        try:
+            compiled.append(re.compile(_join((pattern,)), re.IGNORECASE))
+        except (re.error, RecursionError) as e:
+            logger.warning(f"Skipping invalid filter {pattern}: {e}")
+    return compiled
+
+
+@lru_cache(maxsize=1024)  # Recompiled only when the filters change
+def compile_filters(
+    include: tuple[str, ...], exclude: tuple[str, ...]
+) -> Callable[[str], bool]:
+    include_res = _combine(include)
+    exclude_res = _combine(exclude)
+
+    def matches(text: str) -> bool:
+        if include_res and not any(r.search(text) for r in include_res):
+            return False
+        return not any(r.search(text) for r in exclude_res)
+
+    return matches
+
+
+def get_matcher(rss: dict) -> Callable[[str], bool]:
+    return compile_filters(tuple(rss.get("include", [])), tuple(rss.get("exclude", [])))
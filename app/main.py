@@ -1,14 +1,18 @@
+from hashlib import sha1
 from typing import cast
 
 from telegram.ext import (
+    Application,
     ApplicationBuilder,
     CallbackContext,
     CallbackQueryHandler,
     ContextTypes,
     CommandHandler,
+    JobQueue,
     MessageHandler,
     filters,
 )
+from pymongo.errors import ExecutionTimeout
 from telegram import (
     CallbackQuery,
     Chat,
@@ -19,13 +23,24 @@ from telegram import (
 )
 
 from app.bot.config import app_settings, logger
-from app.bot.db import add_rss_to_user, get_db_user, remove_rss
+from app.bot.db import (
+    add_rss_filter,
+    add_rss_to_user,
+    clear_rss_filters,
+    ensure_indexes,
+    get_db_user,
+    remove_rss,
+    search_entries,
+)
 from app.bot.exc import (
+    InvalidFilterError,
     InvalidRSSURLError,
     RSSAlreadyExist,
     UnexpectedDeletionError,
 )
-from app.bot.feed import get_rss_data
+from app.bot.feed import get_rss_data, load_snapshot, save_snapshot
+from app.bot.fetch import close_http_client, log_fetch_stats
+from app.bot.keywords import get_matcher, validate_filter
 
 
 async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -70,8 +85,10 @@ async def get_news(update: Update, context: ContextTypes.DEFAULT_TYPE):
 
     for rss in user_data["rss_list"]:
         feed = get_rss_data(rss["url"])
+        matches = get_matcher(rss)
+        entries = [entry for entry in feed.entries if matches(entry.title)]
 
-        for entry in feed.entries[:amount]:
+        for entry in entries[:amount]:
             entry_text = f"\n\n{entry.title}\n{entry.link}"
 
             # Split message if it's too long
@@ -178,6 +195,55 @@ async def get_status(update: Update, context: ContextTypes.DEFAULT_TYPE):
         )
 
 
+async def set_filter(update: Update, context: ContextTypes.DEFAULT_TYPE, kind: str):
+    args = cast(list[str], context.args)
+    try:
+        index = int(args[0]) - 1  # Feed numbers are shown starting from 1
+        pattern = " ".join(args[1:])
+        user_data = get_db_user(cast(User, update.effective_user))
+        rss_list = user_data.get("rss_list", [])
+        if not 0 <= index < len(rss_list):
+            raise IndexError()
+        validate_filter(pattern, rss_list[index].get(kind, []))
+        add_rss_filter(
+            cast(User, update.effective_user), rss_list[index]["url"], kind, pattern
+        )
+        message = "Filter added."
+    except (IndexError, ValueError):
+        message = "Provide a valid feed number from /status."
+    except InvalidFilterError:
+        message = "Provide a valid keyword or regex."
+
+    await context.bot.send_message(
+        chat_id=cast(Chat, update.effective_chat).id, text=message
+    )
+
+
+async def include_filter(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await set_filter(update, context, "include")
+
+
+async def exclude_filter(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    await set_filter(update, context, "exclude")
+
+
+async def clear_filters(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    try:
+        index = int(cast(list[str], context.args)[0]) - 1
+        user_data = get_db_user(cast(User, update.effective_user))
+        rss_list = user_data.get("rss_list", [])
+        if not 0 <= index < len(rss_list):
+            raise IndexError()
+        clear_rss_filters(cast(User, update.effective_user), rss_list[index]["url"])
+        message = "Filters removed."
+    except (IndexError, ValueError):
+        message = "Provide a valid feed number from /status."
+
+    await context.bot.send_message(
+        chat_id=cast(Chat, update.effective_chat).id, text=message
+    )
+
+
 async def unknown(update: Update, context: ContextTypes.DEFAULT_TYPE):
     await context.bot.send_message(
         chat_id=cast(Chat, update.effective_chat).id,
@@ -185,21 +251,154 @@ async def unknown(update: Update, context: ContextTypes.DEFAULT_TYPE):
     )
 
 
+def build_search_page(user: User, query: str, query_id: str, page: int):
+    user_data = get_db_user(user)
+
+    if not user_data or "rss_list" not in user_data or not user_data["rss_list"]:
+        return "You have no RSS feeds added.", None
+
+    page_size = app_settings.SEARCH_PAGE_SIZE
+    try:
+        # Fetch one extra result to know whether there is a next page
+        results = search_entries(
+            [rss["url"] for rss in user_data["rss_list"]],
+            query,
+            page * page_size,
+            page_size + 1,
+        )
+    except ExecutionTimeout:
+        return "Search took too long. Try a more specific query.", None
+
+    if not results:
+        return "Nothing found.", None
+
+    message = f'Results for "{query}", page {page + 1}:'
+    for entry in results[:page_size]:
+        message += f"\n\n{entry['title']}\n{entry['link']}"
+
+    buttons = []
+    if page > 0:
+        buttons.append(
+            InlineKeyboardButton(
+                "Previous", callback_data=f"search:{query_id}:{page - 1}"
+            )
+        )
+    if len(results) > page_size:
+        buttons.append(
+            InlineKeyboardButton("Next", callback_data=f"search:{query_id}:{page + 1}")
+        )
+    return message[:4000], InlineKeyboardMarkup([buttons]) if buttons else None
+
+
+async def search(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    query = " ".join(cast(list[str], context.args))
+    if not query:
+        await context.bot.send_message(
+            chat_id=cast(Chat, update.effective_chat).id,
+            text="Provide a search query.",
+        )
+        return
+
+    # Remember the query so page buttons only carry a short id of it,
+    # callback data is limited to 64 bytes
+    query_id = sha1(query.encode()).hexdigest()[:8]
+    search_queries = cast(dict, context.user_data).setdefault("search_queries", {})
+    search_queries.pop(query_id, None)
+    search_queries[query_id] = query
+    while len(search_queries) > app_settings.SEARCH_REMEMBERED_QUERIES:
+        search_queries.pop(next(iter(search_queries)))  # Forget the oldest
+
+    message, reply_markup = build_search_page(
+        cast(User, update.effective_user), query, query_id, 0
+    )
+    await context.bot.send_message(
+        chat_id=cast(Chat, update.effective_chat).id,
+        reply_markup=reply_markup,
+        text=message,
+    )
+
+
+async def search_button_handler(update: Update, context: CallbackContext) -> None:
+    query = update.callback_query
+    await cast(CallbackQuery, query).answer()
+    _, query_id, page = cast(str, cast(CallbackQuery, query).data).split(":")
+    search_queries = cast(dict, context.user_data).get("search_queries", {})
+    search_query = search_queries.get(query_id)
+    if not search_query:
+        await cast(CallbackQuery, query).edit_message_text(
+            text="Search expired. Run /search again."
+        )
+        return
+
+    message, reply_markup = build_search_page(
+        cast(User, update.effective_user), search_query, query_id, int(page)
+    )
+    await cast(CallbackQuery, query).edit_message_text(
+        text=message, reply_markup=reply_markup
+    )
+
+
+async def snapshot_feed_cache(context: CallbackContext):
+    save_snapshot()
+
+
+async def report_fetch_stats(context: CallbackContext):
+    log_fetch_stats()
+
+
+async def post_init(application: Application):
+    ensure_indexes()
+    load_snapshot()
+    # Snapshot on a timer so a crash loses at most one interval of warm cache
+    job_queue = cast(JobQueue, application.job_queue)
+    job_queue.run_repeating(
+        snapshot_feed_cache,
+        interval=app_settings.FEED_CACHE_SNAPSHOT_INTERVAL,
+        first=app_settings.FEED_CACHE_SNAPSHOT_INTERVAL,
+    )
+    job_queue.run_repeating(
+        report_fetch_stats,
+        interval=app_settings.FEED_FETCH_STATS_INTERVAL,
+        first=app_settings.FEED_FETCH_STATS_INTERVAL,
+    )
+
+
+async def post_shutdown(application: Application):
+    save_snapshot()
+    close_http_client()
+
+
 if __name__ == "__main__":
-    app = ApplicationBuilder().token(app_settings.BOT_TOKEN).build()
+    app = (
+        ApplicationBuilder()
+        .token(app_settings.BOT_TOKEN)
+        .post_init(post_init)
+        .post_shutdown(post_shutdown)
+        .build()
+    )
     start_handler = CommandHandler("start", start)
     get_help_handler = CommandHandler("help", get_help)
     get_news_handler = CommandHandler("get", get_news)
     add_feed_handler = CommandHandler("add", add_feed)
     remove_feed_handler = CommandHandler("remove", remove_feed)
     get_status_handler = CommandHandler("status", get_status)
+    include_filter_handler = CommandHandler("include", include_filter)
+    exclude_filter_handler = CommandHandler("exclude", exclude_filter)
+    clear_filters_handler = CommandHandler("clearfilters", clear_filters)
+    search_handler = CommandHandler("search", search)
     unknown_handler = MessageHandler(filters.COMMAND, unknown)
     app.add_handler(start_handler)
     app.add_handler(get_help_handler)
     app.add_handler(get_news_handler)
     app.add_handler(add_feed_handler)
     app.add_handler(remove_feed_handler)
+    app.add_handler(search_handler)
+    # Must come before the catch-all remove button handler
+    app.add_handler(CallbackQueryHandler(search_button_handler, pattern="^search:"))
     app.add_handler(CallbackQueryHandler(remove_button_handler))
     app.add_handler(get_status_handler)
+    app.add_handler(include_filter_handler)
+    app.add_handler(exclude_filter_handler)
+    app.add_handler(clear_filters_handler)
     app.add_handler(unknown_handler)
     app.run_polling()
@@ -0,0 +1,47 @@
+"""Benchmark keyword filters: python -m app.tests.bench_keywords"""
+
+import random
+import string
+from time import perf_counter
+
+from app.bot.keywords import compile_filters
+
+FILTERS = 1_000
+ENTRIES = 10_000
+
+
+def random_word(rng: random.Random) -> str:
+    return "".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10)))
+
+
+def main():
+    rng = random.Random(42)
+    include = tuple(random_word(rng) for _ in range(FILTERS - 10))
+    exclude = tuple(f"/{random_word(rng)}\\d+/" for _ in range(10))
+    titles = [
+        " ".join(random_word(rng) for _ in range(rng.randint(5, 15)))
+        for _ in range(ENTRIES)
+    ]
+
+    start = perf_counter()
+    matches = compile_filters(include, exclude)
+    compiled = perf_counter() - start
+
+    start = perf_counter()
+    matched = sum(1 for title in titles if matches(title))
+    scanned = perf_counter() - start
+
+    start = perf_counter()
+    naive = sum(
+        1 for title in titles if any(keyword in title.lower() for keyword in include)
+    )
+    naive_scanned = perf_counter() - start
+
+    print(f"{FILTERS} filters, {ENTRIES} entries, {matched} matched")
+    print(f"compile: {compiled * 1000:.1f} ms")
+    print(f"compiled scan: {scanned * 1000:.1f} ms")
+    print(f"naive include-only scan: {naive_scanned * 1000:.1f} ms ({naive} matched)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Benchmark refresh workers: python -m app.tests.bench_workers
+
+Run it against a local MongoDB (e.g. docker run -p 27017:27017 mongo) set in
+ATLAS_URI. Feed fetches are simulated with a fixed sleep so only the queue is
+measured.
+"""
+
+from datetime import datetime, timezone
+from multiprocessing import get_context
+from time import perf_counter, sleep
+
+from app.bot.db import ensure_indexes, jobs_collection
+from app.bot.jobs import REFRESH_JOB
+from app.worker import run_worker
+
+JOBS = 200
+FETCH_SECONDS = 0.05
+WORKER_COUNTS = (1, 2, 4, 8)
+
+
+runs_collection = jobs_collection.database["bench_runs"]
+
+
+def simulated_refresh(url: str):
+    sleep(FETCH_SECONDS)
+    runs_collection.insert_one({"key": url})
+
+
+def enqueue_jobs():
+    jobs_collection.delete_many({"key": {"$regex": "^bench:"}})
+    runs_collection.drop()
+    jobs_collection.insert_many(
+        [
+            {
+                "kind": REFRESH_JOB,
+                "key": f"bench:{number}",
+                "status": "pending",
+                "run_at": datetime.now(timezone.utc),
+                "lease_owner": None,
+                "lease_expires_at": None,
+                "attempts": 0,
+            }
+            for number in range(JOBS)
+        ]
+    )
+
+
+def main():
+    ensure_indexes()
+    context = get_context("spawn")
+    baseline = None
+
+    for workers in WORKER_COUNTS:
+        enqueue_jobs()
+        processes = [
+            context.Process(
+                target=run_worker,
+                args=(f"bench-{number}", simulated_refresh, True, False),
+            )
+            for number in range(workers)
+        ]
+        start = perf_counter()
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join()
+        elapsed = perf_counter() - start
+
+        # Every job must run exactly once
+        runs = runs_collection.count_documents({})
+        unique = len(runs_collection.distinct("key"))
+        throughput = JOBS / elapsed
+        baseline = baseline or throughput
+        print(
+            f"{workers} workers: {elapsed:.2f} s, {throughput:.1f} jobs/s, "
+            f"{throughput / baseline:.2f}x, {unique}/{JOBS} jobs in {runs} runs"
+        )
+
+    jobs_collection.delete_many({"key": {"$regex": "^bench:"}})
+    runs_collection.drop()
+
+
+if __name__ == "__main__":
+    main()
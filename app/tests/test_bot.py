@@ -1,12 +1,20 @@
+import re
+import socket
+
+import httpcore
 import pytest
+from datetime import datetime, timezone
+from time import strptime, time
 import feedparser
-from unittest.mock import AsyncMock, patch
+import httpx
+from unittest.mock import AsyncMock, Mock, patch
+from pymongo.errors import ExecutionTimeout
 from telegram import CallbackQuery, Chat, InlineKeyboardMarkup, User
 from telegram.ext import ContextTypes
 
 from app.bot.config import app_settings
-from app.bot import exc
-from app import main
+from app.bot import db, exc, feed, fetch, jobs, keywords
+from app import main, worker
 
 
 @pytest.mark.asyncio
@@ -176,6 +184,156 @@ async def test_get_news_long_messages():
     assert context.bot.send_message.call_count == 3  # Three split messages sent
 
 
+@pytest.mark.asyncio
+async def test_get_news_applies_filters():
+    update = AsyncMock()
+    update.effective_user = User(id=12345, first_name="TestUser", is_bot=False)
+    update.effective_chat = Chat(id=67890, type="private")
+
+    context = AsyncMock(spec=ContextTypes.DEFAULT_TYPE)
+    context.args = ["1"]
+    context.bot.send_message = AsyncMock()
+
+    mock_user_data = {
+        "rss_list": [
+            {
+                "url": "https://rss.com/feed",
+                "include": ["python"],
+                "exclude": ["/snake\\b/"],
+            }
+        ]
+    }
+
+    mock_feed = feedparser.FeedParserDict(
+        {
+            "feed": feedparser.FeedParserDict({"title": "Test RSS Feed"}),
+            "entries": [
+                feedparser.FeedParserDict(
+                    {"title": "Rust 2.0", "link": "https://news1.com"}
+                ),
+                feedparser.FeedParserDict(
+                    {"title": "Python snake", "link": "https://news2.com"}
+                ),
+                feedparser.FeedParserDict(
+                    {"title": "Python 4.0", "link": "https://news3.com"}
+                ),
+            ],
+        }
+    )
+
+    with (
+        patch("app.main.get_db_user", return_value=mock_user_data),
+        patch("app.main.get_rss_data", return_value=mock_feed),
+    ):
+        await main.get_news(update, context)
+
+    context.bot.send_message.assert_called_once_with(
+        chat_id=67890, text="\n\nPython 4.0\nhttps://news3.com"
+    )
+
+
+def test_compile_filters():
+    matches = keywords.compile_filters(("Python", "pytest", "/^rust\\b/"), ("beta",))
+
+    assert matches("New PYTHON release")
+    assert matches("pytest 9 is out")
+    assert matches("Rust 2.0")
+    assert not matches("Trust issues")
+    assert not matches("Python beta")
+    assert keywords.compile_filters(("python",), ()) is keywords.compile_filters(
+        ("python",), ()
+    )
+
+
+def test_validate_filter_invalid_regex():
+    with pytest.raises(exc.InvalidFilterError):
+        keywords.validate_filter("/[unclosed/")
+
+
+@pytest.mark.parametrize(
+    "pattern",
+    [
+        "/(?i)python/",
+        "/(?P<x>a)/",
+        "/(a)\\1/",
+        "/(a)?(?(1)b|c)/",
+        "/(a+)+$/",  # Backtracks exponentially
+        "/(a|aa)*$/",
+        "a" * 1500,
+    ],
+)
+def test_validate_filter_rejects_unsafe_regex(pattern):
+    with pytest.raises(exc.InvalidFilterError):
+        keywords.validate_filter(pattern)
+
+
+def test_compile_filters_skips_unsafe_stored_filters():
+    # Stored before validation rejected them
+    matches = keywords.compile_filters(("news",), ("/(a+)+$/", "a" * 1500))
+
+    assert matches("Latest news " + "a" * 40 + "!")
+
+
+def test_compile_filters_falls_back_to_separate_patterns():
+    compiled = [re.compile("news"), re.compile("python")]
+
+    with patch(
+        "app.bot.keywords.re.compile", side_effect=[RecursionError(), *compiled]
+    ) as mock_compile:
+        matches = keywords.compile_filters(("news", "python"), ())
+
+    assert mock_compile.call_count == 3  # Joined, then one per filter
+    assert matches("Latest news")
+    assert matches("python 4.0")
+    assert not matches("Rust 2.0")
+
+
+@pytest.mark.asyncio
+async def test_include_filter_success():
+    update = AsyncMock()
+    update.effective_user = User(id=12345, first_name="TestUser", is_bot=False)
+    update.effective_chat = Chat(id=67890, type="private")
+
+    context = AsyncMock(spec=ContextTypes.DEFAULT_TYPE)
+    context.args = ["1", "machine", "learning"]
+    context.bot.send_message = AsyncMock()
+
+    mock_user_data = {"rss_list": [{"url": "https://rss.com/feed", "title": "Feed"}]}
+
+    with (
+        patch("app.main.get_db_user", return_value=mock_user_data),
+        patch("app.main.add_rss_filter") as mock_add_filter,
+    ):
+        await main.include_filter(update, context)
+
+    mock_add_filter.assert_called_once_with(
+        update.effective_user, "https://rss.com/feed", "include", "machine learning"
+    )
+    context.bot.send_message.assert_called_once_with(
+        chat_id=67890, text="Filter added."
+    )
+
+
+@pytest.mark.asyncio
+async def test_exclude_filter_invalid_feed_number():
+    update = AsyncMock()
+    update.effective_user = User(id=12345, first_name="TestUser", is_bot=False)
+    update.effective_chat = Chat(id=67890, type="private")
+
+    context = AsyncMock(spec=ContextTypes.DEFAULT_TYPE)
+    context.args = ["5", "sports"]
+    context.bot.send_message = AsyncMock()
+
+    mock_user_data = {"rss_list": [{"url": "https://rss.com/feed", "title": "Feed"}]}
+
+    with patch("app.main.get_db_user", return_value=mock_user_data):
+        await main.exclude_filter(update, context)
+
+    context.bot.send_message.assert_called_once_with(
+        chat_id=67890, text="Provide a valid feed number from /status."
+    )
+
+
 def test_get_rss_data_valid():
     mock_feed = feedparser.FeedParserDict(
         {
@@ -195,14 +353,280 @@ def test_get_rss_data_valid():
 
 def test_get_rss_data_invalid():
     mock_feed = feedparser.FeedParserDict({"bozo": 1})  # Simulating an invalid feed
+    response = httpx.Response(
+        200, request=httpx.Request("GET", "https://invalid-rss.com/feed")
+    )
 
     with (
-        patch("feedparser.parse", return_value=mock_feed),
+        patch.dict(feed.feed_cache, {}, clear=True),
+        patch("app.bot.feed.fetch", return_value=response),
+        patch("app.bot.feed.parse", return_value=mock_feed),
+        patch("app.bot.feed.load_shared_feed", return_value=None),
         pytest.raises(exc.InvalidRSSURLError),
     ):
         main.get_rss_data("https://invalid-rss.com/feed")
 
 
+def test_get_rss_data_serves_fresh_cache():
+    cached = {
+        "etag": '"abc"',
+        "modified": None,
+        "fetched_at": time(),
+        "title": "Cached Feed",
+        "entries": [("News 1", "https://news1.com")],
+    }
+
+    with (
+        patch.dict(feed.feed_cache, {"https://rss.com/feed": cached}, clear=True),
+        patch("app.bot.feed.fetch") as mock_fetch,
+    ):
+        result = feed.get_rss_data("https://rss.com/feed")
+
+    mock_fetch.assert_not_called()
+    assert result.feed.title == "Cached Feed"
+    assert result.entries[0].link == "https://news1.com"
+
+
+def test_get_rss_data_revalidates_stale_cache():
+    cached = {
+        "etag": '"abc"',
+        "modified": "Mon, 01 Jan 2024 00:00:00 GMT",
+        "fetched_at": 0,
+        "title": "Cached Feed",
+        "entries": [("News 1", "https://news1.com")],
+    }
+
+    with (
+        patch.dict(feed.feed_cache, {"https://rss.com/feed": cached}, clear=True),
+        patch("app.bot.feed.fetch", return_value=httpx.Response(304)) as mock_fetch,
+        patch("app.bot.feed.load_shared_feed", return_value=None),
+        patch("app.bot.feed.save_shared_feed") as mock_save_shared,
+    ):
+        result = feed.get_rss_data("https://rss.com/feed")
+        assert feed.feed_cache["https://rss.com/feed"]["fetched_at"] > 0
+
+    mock_save_shared.assert_called_once_with("https://rss.com/feed", cached)
+    mock_fetch.assert_called_once_with(
+        "https://rss.com/feed",
+        {
+            "If-None-Match": '"abc"',
+            "If-Modified-Since": "Mon, 01 Jan 2024 00:00:00 GMT",
+        },
+    )
+    assert result.entries[0].title == "News 1"
+
+
+def test_get_rss_data_uses_shared_feed():
+    shared = {
+        "etag": None,
+        "modified": None,
+        "fetched_at": time(),
+        "title": "Shared Feed",
+        "entries": [["News 1", "https://news1.com"]],
+    }
+
+    with (
+        patch.dict(feed.feed_cache, {}, clear=True),
+        patch("app.bot.feed.load_shared_feed", return_value=shared),
+        patch("app.bot.feed.fetch") as mock_fetch,
+    ):
+        result = feed.get_rss_data("https://rss.com/feed")
+        assert feed.feed_cache["https://rss.com/feed"] is shared
+
+    mock_fetch.assert_not_called()  # Already refreshed by a worker
+    assert result.feed.title == "Shared Feed"
+    assert result.entries[0].title == "News 1"
+
+
+def test_get_rss_data_parses_downloaded_bytes():
+    response = httpx.Response(
+        200,
+        headers={"ETag": '"v2"', "Content-Type": "application/rss+xml"},
+        content=(
+            b'<?xml version="1.0"?><rss version="2.0"><channel>'
+            b"<title>Fetched Feed</title>"
+            b"<item><title>News 1</title><link>/news1</link></item>"
+            b"</channel></rss>"
+        ),
+        request=httpx.Request("GET", "https://rss.com/feed"),
+    )
+
+    with (
+        patch.dict(feed.feed_cache, {}, clear=True),
+        patch("app.bot.feed.fetch", return_value=response),
+        patch("app.bot.feed.store_entries"),
+        patch("app.bot.feed.load_shared_feed", return_value=None),
+        patch("app.bot.feed.save_shared_feed"),
+    ):
+        result = feed.get_rss_data("https://rss.com/feed")
+        assert feed.feed_cache["https://rss.com/feed"]["etag"] == '"v2"'
+
+    assert result.feed.title == "Fetched Feed"
+    assert result.entries[0].link == "https://rss.com/news1"  # Resolved
+
+
+def test_get_rss_data_serves_stale_copy_on_failure():
+    cached = {
+        "etag": None,
+        "modified": None,
+        "fetched_at": 0,
+        "title": "Cached Feed",
+        "entries": [("News 1", "https://news1.com")],
+    }
+
+    with (
+        patch.dict(feed.feed_cache, {"https://rss.com/feed": cached}, clear=True),
+        patch("app.bot.feed.fetch", side_effect=httpx.ConnectError("down")),
+        patch("app.bot.feed.load_shared_feed", return_value=None),
+    ):
+        result = feed.get_rss_data("https://rss.com/feed")
+
+    assert result.feed.title == "Cached Feed"
+    assert result.entries[0].title == "News 1"
+
+
+@pytest.mark.asyncio
+async def test_post_init_schedules_snapshots():
+    application = Mock()
+
+    with (
+        patch("app.main.ensure_indexes"),
+        patch("app.main.load_snapshot") as mock_load,
+    ):
+        await main.post_init(application)
+
+    mock_load.assert_called_once_with()
+    application.job_queue.run_repeating.assert_any_call(
+        main.snapshot_feed_cache,
+        interval=app_settings.FEED_CACHE_SNAPSHOT_INTERVAL,
+        first=app_settings.FEED_CACHE_SNAPSHOT_INTERVAL,
+    )
+    application.job_queue.run_repeating.assert_any_call(
+        main.report_fetch_stats,
+        interval=app_settings.FEED_FETCH_STATS_INTERVAL,
+        first=app_settings.FEED_FETCH_STATS_INTERVAL,
+    )
+
+
+def test_get_rss_data_http_error():
+    with (
+        patch.dict(feed.feed_cache, {}, clear=True),
+        patch("app.bot.feed.fetch", return_value=httpx.Response(404)),
+        patch("app.bot.feed.load_shared_feed", return_value=None),
+        pytest.raises(exc.InvalidRSSURLError),
+    ):
+        feed.get_rss_data("https://rss.com/missing")
+
+
+def test_fetch_counts_bytes():
+    client = httpx.Client(
+        transport=httpx.MockTransport(
+            lambda request: httpx.Response(200, stream=httpx.ByteStream(b"rss"))
+        )
+    )
+
+    with (
+        patch("app.bot.fetch.http_client", client),
+        patch.dict(fetch.fetch_stats, {key: 0 for key in fetch.fetch_stats}),
+    ):
+        fetch.fetch("https://rss.com/feed")
+        stats = fetch.get_fetch_stats()
+
+    assert stats["requests"] == 1
+    assert stats["bytes_downloaded"] == 3
+
+
+def test_resolve_caches_every_address():
+    infos = [
+        (socket.AF_INET6, socket.SOCK_STREAM, 6, "", ("2001:db8::1", 0, 0, 0)),
+        (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("192.0.2.1", 0)),
+        (socket.AF_INET, socket.SOCK_STREAM, 6, "", ("192.0.2.1", 0)),
+    ]
+
+    with (
+        patch.dict(fetch._dns_cache, {}, clear=True),
+        patch("app.bot.fetch.socket.getaddrinfo", return_value=infos) as mock_dns,
+    ):
+        assert fetch.resolve("rss.com") == ["2001:db8::1", "192.0.2.1"]
+        assert fetch.resolve("rss.com") == ["2001:db8::1", "192.0.2.1"]
+
+    mock_dns.assert_called_once()
+
+
+def test_connect_tcp_falls_back_to_next_address():
+    backend = fetch._CachingDNSBackend()
+    stream = Mock()
+
+    with (
+        patch("app.bot.fetch.resolve", return_value=["2001:db8::1", "192.0.2.1"]),
+        patch(
+            "httpcore.SyncBackend.connect_tcp",
+            side_effect=[httpcore.ConnectError("unreachable"), stream],
+        ) as mock_connect,
+    ):
+        assert backend.connect_tcp("rss.com", 443) is stream
+
+    assert mock_connect.call_args.args[0] == "192.0.2.1"
+
+
+def test_proxy_mounts_follow_environment():
+    proxies = {"https": "http://proxy:3128", "no": "internal.example"}
+
+    with patch("app.bot.fetch.getproxies", return_value=proxies):
+        mounts = fetch._proxy_mounts()
+
+    assert isinstance(mounts["https://"], httpx.HTTPTransport)
+    assert "http://" not in mounts
+    assert mounts["all://internal.example"] is None
+    assert mounts["all://*.internal.example"] is None
+
+
+def test_log_fetch_stats():
+    with (
+        patch.dict(fetch.fetch_stats, {key: 0 for key in fetch.fetch_stats}),
+        patch("app.bot.fetch.logger") as mock_logger,
+    ):
+        fetch.log_fetch_stats()
+
+    (message,), _ = mock_logger.info.call_args
+    assert "connections_reused" in message
+    assert "bytes_downloaded" in message
+
+
+def test_http_client_uses_caching_dns_backend():
+    # Fails loudly if an httpx/httpcore upgrade moves the pool internals
+    pool = fetch.http_client._transport._pool
+    assert isinstance(pool._network_backend, fetch._CachingDNSBackend)
+    assert fetch.http_client.headers["Accept-Encoding"] == "gzip, br"
+
+
+def test_feed_cache_snapshot_roundtrip(tmp_path):
+    path = str(tmp_path / "feed_cache.pickle")
+    cached = {
+        "etag": None,
+        "modified": None,
+        "fetched_at": 1.0,
+        "title": "Cached Feed",
+        "entries": [("News 1", "https://news1.com")],
+    }
+
+    with patch.dict(feed.feed_cache, {"https://rss.com/feed": cached}, clear=True):
+        feed.save_snapshot(path)
+
+    with patch.dict(feed.feed_cache, {}, clear=True):
+        feed.load_snapshot(path)
+        assert feed.feed_cache == {"https://rss.com/feed": cached}
+
+
+def test_load_snapshot_garbled_file(tmp_path):
+    path = tmp_path / "feed_cache.pickle"
+    path.write_bytes(b"\x80\x05garbage")
+
+    with patch.dict(feed.feed_cache, {}, clear=True):
+        feed.load_snapshot(str(path))
+        assert feed.feed_cache == {}
+
+
 @pytest.mark.asyncio
 async def test_add_feed_success():
     update = AsyncMock()
@@ -429,3 +853,259 @@ async def test_get_status_few_feeds():
     context.bot.send_message.assert_any_call(
         chat_id=67890, text="\n1. Feed 1\n2. Feed 2"
     )
+
+
+@pytest.mark.asyncio
+async def test_search_no_query():
+    update = AsyncMock()
+    update.effective_chat = Chat(id=67890, type="private")
+
+    context = AsyncMock(spec=ContextTypes.DEFAULT_TYPE)
+    context.args = []
+    context.bot.send_message = AsyncMock()
+
+    await main.search(update, context)
+
+    context.bot.send_message.assert_called_once_with(
+        chat_id=67890, text="Provide a search query."
+    )
+
+
+@pytest.mark.asyncio
+async def test_search_success_with_next_page():
+    update = AsyncMock()
+    update.effective_user = User(id=12345, first_name="TestUser", is_bot=False)
+    update.effective_chat = Chat(id=67890, type="private")
+
+    context = AsyncMock(spec=ContextTypes.DEFAULT_TYPE)
+    context.args = ["python", "release"]
+    context.user_data = {}
+    context.bot.send_message = AsyncMock()
+
+    mock_user_data = {"rss_list": [{"url": "https://rss.com/feed"}]}
+    mock_results = [
+        {"title": f"News {i}", "link": f"https://news{i}.com"}
+        for i in range(app_settings.SEARCH_PAGE_SIZE + 1)
+    ]
+
+    with (
+        patch("app.main.get_db_user", return_value=mock_user_data),
+        patch("app.main.search_entries", return_value=mock_results) as mock_search,
+        patch("app.main.get_rss_data") as mock_get_rss,
+    ):
+        await main.search(update, context)
+
+    mock_get_rss.assert_not_called()  # Search never fetches feeds
+    mock_search.assert_called_once_with(
+        ["https://rss.com/feed"],
+        "python release",
+        0,
+        app_settings.SEARCH_PAGE_SIZE + 1,
+    )
+    _, kwargs = context.bot.send_message.call_args
+    assert "News 0" in kwargs["text"]
+    assert f"News {app_settings.SEARCH_PAGE_SIZE}" not in kwargs["text"]
+    button = kwargs["reply_markup"].inline_keyboard[0][0]
+    _, query_id, page = button.callback_data.split(":")
+    assert page == "1"
+    assert context.user_data["search_queries"][query_id] == "python release"
+
+
+@pytest.mark.asyncio
+async def test_search_button_handler_pages_original_query():
+    update = AsyncMock()
+    update.effective_user = User(id=12345, first_name="TestUser", is_bot=False)
+    query = AsyncMock(spec=CallbackQuery)
+    query.data = "search:aaaaaaaa:1"
+    query.answer = AsyncMock()
+    query.edit_message_text = AsyncMock()
+
+    update.callback_query = query
+    context = AsyncMock()
+    context.user_data = {
+        "search_queries": {"aaaaaaaa": "python", "bbbbbbbb": "rust"}  # Newer query
+    }
+
+    with patch(
+        "app.main.build_search_page", return_value=("Results", None)
+    ) as mock_build:
+        await main.search_button_handler(update, context)
+
+    mock_build.assert_called_once_with(update.effective_user, "python", "aaaaaaaa", 1)
+
+
+@pytest.mark.asyncio
+async def test_search_timeout():
+    update = AsyncMock()
+    update.effective_user = User(id=12345, first_name="TestUser", is_bot=False)
+    update.effective_chat = Chat(id=67890, type="private")
+
+    context = AsyncMock(spec=ContextTypes.DEFAULT_TYPE)
+    context.args = ["python"]
+    context.user_data = {}
+    context.bot.send_message = AsyncMock()
+
+    mock_user_data = {"rss_list": [{"url": "https://rss.com/feed"}]}
+
+    with (
+        patch("app.main.get_db_user", return_value=mock_user_data),
+        patch("app.main.search_entries", side_effect=ExecutionTimeout("timeout")),
+    ):
+        await main.search(update, context)
+
+    context.bot.send_message.assert_called_once_with(
+        chat_id=67890,
+        reply_markup=None,
+        text="Search took too long. Try a more specific query.",
+    )
+
+
+@pytest.mark.asyncio
+async def test_search_button_handler_expired():
+    update = AsyncMock()
+    query = AsyncMock(spec=CallbackQuery)
+    query.data = "search:aaaaaaaa:1"
+    query.answer = AsyncMock()
+    query.edit_message_text = AsyncMock()
+
+    update.callback_query = query
+    context = AsyncMock()
+    context.user_data = {}
+
+    await main.search_button_handler(update, context)
+
+    query.answer.assert_called_once()
+    query.edit_message_text.assert_called_once_with(
+        text="Search expired. Run /search again."
+    )
+
+
+def test_claim_job_leases_due_job():
+    with patch("app.bot.jobs.jobs_collection") as mock_jobs:
+        jobs.claim_job("worker-1")
+
+    query, update = mock_jobs.find_one_and_update.call_args.args
+    assert {"status": "pending"} in query["$or"]
+    assert update["$set"]["status"] == "leased"
+    assert update["$set"]["lease_owner"] == "worker-1"
+    assert update["$inc"] == {"attempts": 1}
+
+
+def test_release_job_lost_lease():
+    job = {"_id": 1, "key": "https://rss.com/feed", "attempts": 1}
+
+    with patch("app.bot.jobs.jobs_collection") as mock_jobs:
+        mock_jobs.update_one.return_value.matched_count = 0
+        assert not jobs.release_job(job, "worker-1", 600)
+
+    query, _ = mock_jobs.update_one.call_args.args
+    assert query == {"_id": 1, "lease_owner": "worker-1", "status": "leased"}
+
+
+def test_run_worker_refreshes_claimed_job():
+    job = {"_id": 1, "key": "https://rss.com/feed", "attempts": 1}
+    handler = Mock()
+
+    with (
+        patch("app.worker.claim_job", side_effect=[job, None]),
+        patch("app.worker.release_job") as mock_release,
+        patch("app.worker.heartbeat"),
+    ):
+        worker.run_worker("worker-1", handler, stop_when_idle=True, sync_jobs=False)
+
+    handler.assert_called_once_with("https://rss.com/feed")
+    mock_release.assert_called_once_with(
+        job,
+        "worker-1",
+        app_settings.FEED_CACHE_TTL - app_settings.JOB_LEASE_SECONDS,
+        False,
+    )
+
+
+def test_run_worker_reports_fetch_stats():
+    with (
+        patch("app.worker.claim_job", return_value=None),
+        patch("app.worker.monotonic", side_effect=[0, 1_000_000, 1_000_000]),
+        patch("app.worker.log_fetch_stats") as mock_log_stats,
+    ):
+        worker.run_worker("worker-1", stop_when_idle=True, sync_jobs=False)
+
+    mock_log_stats.assert_called_once_with()
+
+
+def test_refresh_delay_is_clamped():
+    with (
+        patch.object(app_settings, "FEED_CACHE_TTL", 30),
+        patch.object(app_settings, "JOB_LEASE_SECONDS", 60),
+    ):
+        assert worker.refresh_delay() == 0
+
+
+def test_run_worker_survives_unexpected_error():
+    job = {"_id": 1, "key": "https://rss.com/feed", "attempts": 1}
+    handler = Mock(side_effect=RuntimeError("boom"))
+
+    with (
+        patch("app.worker.claim_job", side_effect=[job, None]),
+        patch("app.worker.release_job") as mock_release,
+        patch("app.worker.heartbeat"),
+    ):
+        worker.run_worker("worker-1", handler, stop_when_idle=True, sync_jobs=False)
+
+    mock_release.assert_called_once_with(
+        job, "worker-1", app_settings.JOB_RETRY_DELAY, True
+    )
+
+
+def test_sync_refresh_jobs_batches_upserts():
+    urls = ["https://rss.com/feed", "https://rss.com/other"]
+
+    with (
+        patch("app.bot.jobs.get_subscribed_urls", return_value=urls),
+        patch("app.bot.jobs.jobs_collection") as mock_jobs,
+    ):
+        assert jobs.sync_refresh_jobs() == 2
+
+    mock_jobs.update_one.assert_not_called()
+    (operations,), _ = mock_jobs.bulk_write.call_args
+    assert [operation._filter["key"] for operation in operations] == urls
+    mock_jobs.delete_many.assert_called_once_with(
+        {"kind": jobs.REFRESH_JOB, "key": {"$nin": urls}}
+    )
+
+
+def test_run_worker_backs_off_failed_job():
+    job = {"_id": 1, "key": "https://rss.com/feed", "attempts": 3}
+    handler = Mock(side_effect=exc.InvalidRSSURLError)
+
+    with (
+        patch("app.worker.claim_job", side_effect=[job, None]),
+        patch("app.worker.release_job") as mock_release,
+        patch("app.worker.heartbeat"),
+    ):
+        worker.run_worker("worker-1", handler, stop_when_idle=True, sync_jobs=False)
+
+    mock_release.assert_called_once_with(
+        job,
+        "worker-1",
+        min(app_settings.JOB_RETRY_DELAY * 4, worker.refresh_delay()),
+        True,
+    )
+
+
+def test_store_entries_reads_published_as_utc():
+    entry = feedparser.FeedParserDict(
+        {
+            "title": "News 1",
+            "link": "https://news1.com",
+            "published_parsed": strptime("2024-01-01 12:00", "%Y-%m-%d %H:%M"),
+        }
+    )
+
+    with patch("app.bot.db.entries_collection") as mock_entries:
+        db.store_entries("https://rss.com/feed", [entry])
+
+    (operation,), _ = mock_entries.bulk_write.call_args
+    assert operation[0]._doc["$set"]["published"] == datetime(
+        2024, 1, 1, 12, tzinfo=timezone.utc
+    )
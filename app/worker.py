@@ -0,0 +1,106 @@
+import argparse
+import os
+import socket
+from multiprocessing import get_context
+from time import monotonic, sleep
+from typing import Callable
+
+from pymongo.errors import PyMongoError
+
+from app.bot.config import app_settings, logger
+from app.bot.db import ensure_indexes
+from app.bot.exc import InvalidRSSURLError
+from app.bot.feed import get_rss_data
+from app.bot.fetch import log_fetch_stats
+from app.bot.jobs import claim_job, heartbeat, release_job, sync_refresh_jobs
+
+
+def refresh_feed(url: str):
+    get_rss_data(url)
+
+
+def refresh_delay() -> int:
+    # Refresh one lease length before the shared feed expires, so the bot
+    # doesn't find it stale and fetch it itself
+    return max(app_settings.FEED_CACHE_TTL - app_settings.JOB_LEASE_SECONDS, 0)
+
+
+def run_worker(
+    worker_id: str,
+    handler: Callable[[str], None] = refresh_feed,
+    stop_when_idle: bool = False,
+    sync_jobs: bool = True,
+):
+    logger.info(f"Worker {worker_id} started")
+    last_sync = float("-inf")
+    last_stats = monotonic()
+
+    while True:
+        if sync_jobs and monotonic() - last_sync >= app_settings.JOB_SYNC_INTERVAL:
+            try:
+                logger.info(f"Worker {worker_id} synced {sync_refresh_jobs()} feeds")
+            except PyMongoError as e:
+                logger.warning(f"Failed to sync refresh jobs: {e}")
+            last_sync = monotonic()
+
+        if monotonic() - last_stats >= app_settings.FEED_FETCH_STATS_INTERVAL:
+            log_fetch_stats()
+            last_stats = monotonic()
+
+        try:
+            job = claim_job(worker_id)
+        except PyMongoError as e:
+            logger.warning(f"Failed to claim job: {e}")
+            job = None
+
+        if not job:
+            if stop_when_idle:
+                return
+            sleep(app_settings.JOB_POLL_INTERVAL)
+            continue
+
+        failed = True
+        with heartbeat(job, worker_id):
+            try:
+                handler(job["key"])
+                failed = False
+            except InvalidRSSURLError:
+                logger.warning(f"Worker {worker_id} failed to refresh {job['key']}")
+            except Exception:
+                # Keep the worker alive and hand the job back instead
+                logger.exception(f"Worker {worker_id} crashed on job {job['_id']}")
+
+        delay = refresh_delay()
+        if failed:
+            # Back off exponentially, but never wait longer than a normal refresh
+            delay = min(
+                app_settings.JOB_RETRY_DELAY * 2 ** (job["attempts"] - 1), delay
+            )
+        try:
+            release_job(job, worker_id, delay, failed)
+        except PyMongoError as e:
+            # The lease expires on its own and another worker picks the job up
+            logger.warning(f"Failed to release job {job['_id']}: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run feed refresh workers.")
+    parser.add_argument("--processes", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    ensure_indexes()
+    prefix = f"{socket.gethostname()}-{os.getpid()}"
+    # Spawn so every worker opens its own MongoClient, pymongo isn't fork-safe
+    context = get_context("spawn")
+    processes = [
+        context.Process(target=run_worker, args=(f"{prefix}-{number}",))
+        for number in range(args.processes)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+
+
+if __name__ == "__main__":
+    main()